@@ -0,0 +1,458 @@
+import threading
+
+import numpy as np
+import shapely
+
+try:
+    import numba
+    from numba import njit, prange
+
+    # Streamlit runs every session's script in its own thread: prefer OpenMP,
+    # which is thread-safe and, unlike TBB, does not hang interpreter shutdown
+    # after being used off the main thread
+    numba.config.THREADING_LAYER_PRIORITY = ["omp", "tbb", "workqueue"]
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Serializes kernel launches, as the workqueue fallback layer is not thread-safe
+_KERNEL_LOCK = threading.Lock()
+
+
+# 2**27 + 1, splits a double into two halves whose products are exact
+_SPLITTER = 134217729.0
+
+
+def _product_error(a, b, product):
+    """Exact rounding error of product = a * b (Dekker's TwoProduct).
+
+    Works element-wise on arrays as well as on scalars, and compiles with Numba.
+    """
+    c = _SPLITTER * a
+    a_hi = c - (c - a)
+    a_lo = a - a_hi
+    c = _SPLITTER * b
+    b_hi = c - (c - b)
+    b_lo = b - b_hi
+    return ((a_hi * b_hi - product) + a_hi * b_lo + a_lo * b_hi) + a_lo * b_lo
+
+
+def round_decimals(values, precision):
+    """Round values to precision decimals exactly as float(f"{v:.{precision}f}").
+
+    rint(v * 10**precision) / 10**precision alone drifts once the product has
+    no fractional bits left (|v| * 10**precision >= 2**52) and on products
+    rounded onto a tie, so the exact error of the product decides those cases.
+    Values that cannot change (including NaN) are returned as they are.
+    """
+    scale = 10.0 ** precision
+    with np.errstate(invalid="ignore", over="ignore"):
+        scaled = values * scale
+        rounded = np.rint(scaled)
+        # Only products on a tie or past 2**52 (where the error can reach 0.5)
+        # can round the wrong way, so the exact error is only taken for those
+        suspect = np.abs(scaled - rounded) == 0.5
+        suspect |= np.abs(scaled) >= 2.0 ** 52
+        rounded /= scale
+        if not suspect.any():
+            return rounded
+
+        value = values[suspect]
+        product = scaled[suspect]
+        error = _product_error(value, scale, product)
+        ticks = np.rint(product)
+        offset = product - ticks
+        ticks += (offset == 0.5) & (error > 0)
+        ticks -= (offset == -0.5) & (error < 0)
+        ticks += np.sign(error) * ((np.abs(error) == 0.5) & (np.fmod(ticks, 2) != 0))
+        # From 2**53 a double has no digits beyond precision left to round
+        rounded[suspect] = np.where(np.abs(product) < 2.0 ** 53, ticks / scale, value)
+        return rounded
+
+
+def ring_layout(geometries):
+    """Split the flat coordinate buffer of geometries into rings.
+
+    Returns the start offsets of each segment (with the total length appended),
+    its orientation sign (1 for polygon exteriors, -1 for interiors and 0 for
+    the coordinates of non-polygonal parts, which are never reoriented), the
+    index of the geometry it belongs to and the index of its part.
+    """
+    parts, part_index = shapely.get_parts(geometries, return_index=True)
+    type_ids = shapely.get_type_id(parts)
+    # get_parts flattens a single level; collections nested in a
+    # GeometryCollection (e.g. a MultiPolygon member) need further passes
+    while np.isin(type_ids, (4, 5, 6, 7)).any():
+        parts, index = shapely.get_parts(parts, return_index=True)
+        part_index = part_index[index]
+        type_ids = shapely.get_type_id(parts)
+    is_polygon = type_ids == 3
+
+    rings, ring_part = shapely.get_rings(parts[is_polygon], return_index=True)
+    ring_part = np.flatnonzero(is_polygon)[ring_part]
+    is_exterior = np.ones(len(rings), dtype=bool)
+    is_exterior[1:] = ring_part[1:] != ring_part[:-1]
+
+    other_part = np.flatnonzero(~is_polygon)
+    segment_part = np.concatenate([ring_part, other_part])
+    lengths = np.concatenate([
+        shapely.get_num_coordinates(rings),
+        shapely.get_num_coordinates(parts[other_part]),
+    ])
+    signs = np.concatenate([
+        np.where(is_exterior, 1, -1),
+        np.zeros(len(other_part), dtype=np.int64),
+    ]).astype(np.int8)
+
+    # Rings keep their order within a part, so a stable sort restores buffer order
+    order = np.argsort(segment_part, kind="stable")
+    offsets = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(lengths[order], out=offsets[1:])
+    segment_part = segment_part[order]
+    return offsets, signs[order], part_index[segment_part], segment_part
+
+
+if NUMBA_AVAILABLE:
+
+    _product_error_jit = njit(cache=True)(_product_error)
+
+    @njit(cache=True)
+    def _round_decimal(value, scale):
+        """round_decimals for a single value, with scale = 10**precision."""
+        scaled = value * scale
+        # Also False for NaN (missing Z)
+        if not abs(scaled) < 2.0 ** 53:
+            return value
+        error = _product_error_jit(value, scale, scaled)
+        ticks = np.rint(scaled)
+        offset = scaled - ticks
+        if offset == 0.5 and error > 0:
+            ticks += 1.0
+        elif offset == -0.5 and error < 0:
+            ticks -= 1.0
+        elif abs(error) == 0.5 and ticks % 2 != 0:
+            ticks += np.sign(error)
+        return ticks / scale
+
+    @njit(cache=True)
+    def _ring_area(coords, start, end):
+        """Shoelace signed area of a ring, relative to its first vertex.
+
+        Taking the products at projected magnitudes (UTM eastings and northings)
+        would cancel most of the significant digits of small rings.
+        """
+        x0 = coords[start, 0]
+        y0 = coords[start, 1]
+        area = 0.0
+        for i in range(start, end - 1):
+            area += (coords[i, 0] - x0) * (coords[i + 1, 1] - y0) - (
+                coords[i + 1, 0] - x0
+            ) * (coords[i, 1] - y0)
+        return 0.5 * area
+
+    @njit(cache=True)
+    def _orientation_index(ax, ay, bx, by, cx, cy):
+        """Side of c relative to the line a-b (1 left, -1 right, 0 collinear).
+
+        The floating-point filter of GEOS' orientation predicate; returns 2 when
+        double precision cannot decide and GEOS would fall back to extended
+        precision.
+        """
+        det_left = (ax - cx) * (by - cy)
+        det_right = (ay - cy) * (bx - cx)
+        det = det_left - det_right
+        if det_left > 0.0:
+            if det_right <= 0.0:
+                return int(np.sign(det))
+            det_sum = det_left + det_right
+        elif det_left < 0.0:
+            if det_right >= 0.0:
+                return int(np.sign(det))
+            det_sum = -det_left - det_right
+        else:
+            return int(np.sign(det))
+        err_bound = 1e-15 * det_sum
+        if det >= err_bound or -det >= err_bound:
+            return int(np.sign(det))
+        return 2
+
+    @njit(cache=True)
+    def _same_point(coords, i, k):
+        """Whether points i and k of a buffer coincide in 2D."""
+        return coords[i, 0] == coords[k, 0] and coords[i, 1] == coords[k, 1]
+
+    @njit(cache=True)
+    def _ring_is_ccw(coords, start, end):
+        """Whether a ring is counterclockwise, as shapely.is_ccw decides it.
+
+        A port of GEOS' Orientation::isCCW, so self-intersecting and degenerate
+        rings get the same answer as orient_polygons gives them. Returns 1 if
+        counterclockwise, 0 if not and -1 when the decision needs more than
+        double precision.
+        """
+        n_pts = end - start - 1
+        if n_pts < 3:
+            return 0
+
+        # The highest point reached by a rising segment; none if the ring is flat
+        up_hi = start
+        up_low = start
+        found = False
+        prev_y = coords[start, 1]
+        for i in range(start + 1, end):
+            y = coords[i, 1]
+            if y > prev_y and y >= coords[up_hi, 1]:
+                up_hi = i
+                up_low = i - 1
+                found = True
+            prev_y = y
+        if not found:
+            return 0
+
+        # The next point lower than the high point, and the one just before it
+        down_low = up_hi - start
+        while True:
+            down_low = (down_low + 1) % n_pts
+            if down_low == up_hi - start or coords[start + down_low, 1] != coords[up_hi, 1]:
+                break
+        down_hi = start + (down_low - 1 if down_low > 0 else n_pts - 1)
+        down_low += start
+
+        if _same_point(coords, up_hi, down_hi):
+            # A pointed cap: its orientation is the ring's, unless it folds back
+            if (
+                _same_point(coords, up_low, up_hi)
+                or _same_point(coords, down_low, up_hi)
+                or _same_point(coords, up_low, down_low)
+            ):
+                return 0
+            index = _orientation_index(
+                coords[up_low, 0], coords[up_low, 1],
+                coords[up_hi, 0], coords[up_hi, 1],
+                coords[down_low, 0], coords[down_low, 1],
+            )
+            if index == 2:
+                return -1
+            return 1 if index == 1 else 0
+        # A flat cap: its direction gives the orientation
+        return 1 if coords[down_hi, 0] - coords[up_hi, 0] < 0 else 0
+
+    def _make_round_and_orient(n_dims):
+        """Compile the kernel for a fixed number of coordinate dimensions.
+
+        n_dims is a compile-time constant, so the 2D variant never touches a Z
+        column and the per-point dimension loop is unrolled.
+        """
+
+        def kernel(coords, ring_offsets, ring_signs, precision, do_ccw):
+            scale = 10.0 ** precision
+            n_rings = len(ring_offsets) - 1
+            areas_before = np.zeros(n_rings)
+            areas_after = np.zeros(n_rings)
+            ccw_before = np.zeros(n_rings, dtype=np.int8)
+            ccw_after = np.zeros(n_rings, dtype=np.int8)
+            extra_before = np.zeros(n_rings, dtype=np.bool_)
+            extra_after = np.zeros(n_rings, dtype=np.bool_)
+            changed = np.zeros(n_rings, dtype=np.bool_)
+            for r in prange(n_rings):
+                start = ring_offsets[r]
+                end = ring_offsets[r + 1]
+                is_ring = ring_signs[r] != 0
+                if is_ring:
+                    areas_before[r] = _ring_area(coords, start, end)
+                    ccw_before[r] = _ring_is_ccw(coords, start, end)
+
+                for i in range(start, end):
+                    for j in range(n_dims):
+                        value = coords[i, j]
+                        rounded = _round_decimal(value, scale)
+                        if rounded != value and value == value:
+                            coords[i, j] = rounded
+                            extra_before[r] = True
+                            if _round_decimal(rounded, scale) != rounded:
+                                extra_after[r] = True
+                changed[r] = extra_before[r]
+                if not is_ring:
+                    continue
+
+                area_after = _ring_area(coords, start, end)
+                ccw = _ring_is_ccw(coords, start, end)
+                # Undecided rings are left for process_geometries to settle
+                if do_ccw and ccw != -1 and (ccw == 1) != (ring_signs[r] == 1):
+                    i, k = start, end - 1
+                    while i < k:
+                        for j in range(n_dims):
+                            tmp = coords[i, j]
+                            coords[i, j] = coords[k, j]
+                            coords[k, j] = tmp
+                        i += 1
+                        k -= 1
+                    area_after = -area_after
+                    ccw = _ring_is_ccw(coords, start, end)
+                    changed[r] = True
+                areas_after[r] = area_after
+                ccw_after[r] = ccw
+            return (
+                areas_before, areas_after, ccw_before, ccw_after,
+                extra_before, extra_after, changed,
+            )
+
+        # Both variants share the source line numba keys its on-disk cache by;
+        # a distinct name keeps one from loading the other's machine code
+        kernel.__qualname__ = f"round_and_orient_{n_dims}d"
+        # No fastmath: exact rounding and the orientation filter both rely on
+        # strict IEEE evaluation order
+        return njit(parallel=True, cache=True)(kernel)
+
+    _KERNELS = {2: _make_round_and_orient(2), 3: _make_round_and_orient(3)}
+
+    def round_and_orient(coords, ring_offsets, ring_signs, precision, do_ccw):
+        """Round coords in place and reverse the rings with the wrong orientation.
+
+        Everything is measured in the same traversal, per ring: the signed area
+        and orientation (1 counterclockwise, 0 not, -1 undecided in double
+        precision) before and after processing, whether any coordinate had more
+        than precision decimals before and after rounding, and whether the ring
+        was modified at all.
+        """
+        kernel = _KERNELS[coords.shape[1]]
+        with _KERNEL_LOCK:
+            return kernel(coords, ring_offsets, ring_signs, precision, do_ccw)
+
+    def warmup():
+        """Compile (or load from cache) the kernels ahead of the first upload.
+
+        Runs once, when the module is first imported; the import lock already
+        keeps other threads out, so the kernel lock is not taken.
+        """
+        for n_dims, kernel in _KERNELS.items():
+            kernel(
+                np.zeros((0, n_dims)), np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int8),
+                6, True,
+            )
+
+    warmup()
+
+
+def any_has_z(geometries):
+    """Whether any of the geometries has Z coordinates."""
+    return bool(shapely.has_z(geometries).any())
+
+
+def _orientation_counts(type_ids, ring_geometry, ring_part, ring_signs, areas, ccw):
+    """Orientation statistics, as check_orientation_stats, from per-ring results."""
+    polygonal = np.isin(type_ids, (3, 6))
+    polygonal_count = int(np.count_nonzero(polygonal))
+
+    # MultiPolygons are judged by their largest part (exterior minus holes)
+    ring_area = np.abs(areas) * ring_signs
+    exterior = np.flatnonzero((ring_signs == 1) & polygonal[ring_geometry])
+    part_area = np.bincount(ring_part, weights=ring_area)[ring_part[exterior]]
+    order = np.lexsort((-part_area, ring_geometry[exterior]))
+    sorted_geometry = ring_geometry[exterior][order]
+    first_of_feature = np.ones(len(order), dtype=bool)
+    first_of_feature[1:] = sorted_geometry[1:] != sorted_geometry[:-1]
+
+    ccw_count = int(np.count_nonzero(ccw[exterior][order[first_of_feature]] == 1))
+    return {
+        "ccw": ccw_count,
+        "cw": polygonal_count - ccw_count,
+        "other": len(type_ids) - polygonal_count,
+    }
+
+
+def _rings_are_ccw(coords, ring_offsets, rings):
+    """shapely.is_ccw of the given rings of a coordinate buffer."""
+    lengths = np.diff(ring_offsets)[rings]
+    points = np.concatenate(
+        [coords[ring_offsets[r]:ring_offsets[r + 1], :2] for r in rings]
+    )
+    indices = np.repeat(np.arange(len(rings)), lengths)
+    return shapely.is_ccw(shapely.linearrings(points, indices=indices)).astype(np.int8)
+
+
+def extract_buffers(geometries, include_z=None):
+    """Extract the coordinate buffer and ring layout that the kernel works on.
+
+    The result only depends on the input geometries, so it can be kept and
+    passed to process_geometries again for every precision the user tries.
+    """
+    if include_z is None:
+        include_z = any_has_z(geometries)
+    ring_offsets, ring_signs, ring_geometry, ring_part = ring_layout(geometries)
+    return {
+        "coords": shapely.get_coordinates(geometries, include_z=include_z),
+        "ring_offsets": ring_offsets,
+        "ring_signs": ring_signs,
+        "ring_geometry": ring_geometry,
+        "ring_part": ring_part,
+        "type_ids": shapely.get_type_id(geometries),
+    }
+
+
+def process_geometries(
+    geometries, precision=6, do_ccw=True, include_z=None, buffers=None, scratch=None
+):
+    """Round and orient an array of geometries with a single pass of the kernel.
+
+    Only the geometries the kernel actually modified are rebuilt. Pass include_z
+    when it is already known to skip scanning the geometries for Z, buffers from
+    extract_buffers to skip extracting the coordinates again, and a scratch
+    array of the same shape as the coordinates to round into without allocating.
+
+    Returns the processed geometries and the precision and orientation
+    statistics before and after processing, gathered in the same pass.
+    """
+    geometries = np.array(geometries, dtype=object)
+    if buffers is None:
+        buffers = extract_buffers(geometries, include_z)
+    if scratch is None or scratch.shape != buffers["coords"].shape:
+        coords = buffers["coords"].copy()
+    else:
+        coords = scratch
+        np.copyto(coords, buffers["coords"])
+
+    ring_offsets = buffers["ring_offsets"]
+    ring_signs = buffers["ring_signs"]
+    ring_geometry = buffers["ring_geometry"]
+    ring_part = buffers["ring_part"]
+    (
+        areas_before, areas_after, ccw_before, ccw_after,
+        extra_before, extra_after, changed,
+    ) = round_and_orient(coords, ring_offsets, ring_signs, precision, do_ccw)
+
+    # Rings too close to collinear for the double-precision filter go to GEOS
+    undecided = np.flatnonzero(ccw_before == -1)
+    if len(undecided):
+        ccw_before[undecided] = _rings_are_ccw(buffers["coords"], ring_offsets, undecided)
+    undecided = np.flatnonzero(ccw_after == -1)
+    if len(undecided):
+        ccw_after[undecided] = _rings_are_ccw(coords, ring_offsets, undecided)
+        if do_ccw:
+            wrong = undecided[(ccw_after[undecided] == 1) != (ring_signs[undecided] == 1)]
+            for r in wrong:
+                ring = slice(ring_offsets[r], ring_offsets[r + 1])
+                coords[ring] = coords[ring][::-1].copy()
+            if len(wrong):
+                areas_after[wrong] *= -1
+                ccw_after[wrong] = _rings_are_ccw(coords, ring_offsets, wrong)
+                changed[wrong] = True
+
+    type_ids = buffers["type_ids"]
+    stats = {
+        "high_precision_before": len(np.unique(ring_geometry[extra_before])),
+        "high_precision_after": len(np.unique(ring_geometry[extra_after])),
+        "orientation_before": _orientation_counts(
+            type_ids, ring_geometry, ring_part, ring_signs, areas_before, ccw_before
+        ),
+        "orientation_after": _orientation_counts(
+            type_ids, ring_geometry, ring_part, ring_signs, areas_after, ccw_after
+        ),
+    }
+
+    needs_update = np.bincount(ring_geometry, weights=changed, minlength=len(geometries)) > 0
+    if needs_update.any():
+        idxs = np.flatnonzero(needs_update)
+        keep = np.repeat(needs_update[ring_geometry], np.diff(ring_offsets))
+        geometries[idxs] = shapely.set_coordinates(geometries[idxs], coords[keep])
+    return geometries, stats
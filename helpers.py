@@ -0,0 +1,185 @@
+import io
+
+import numpy as np
+import pandas as pd
+import shapely
+
+import geom_kernel
+
+# Arrow's multi-threaded CSV reader, with pandas as fallback
+try:
+    import pyarrow.csv as pacsv
+except ImportError:
+    pacsv = None
+
+
+def round_coordinates(geometries, precision=6, include_z=None):
+    """Round the coordinates of an array of geometries in a single vectorized pass.
+
+    Only the geometries whose coordinates actually change are rebuilt.
+    """
+    geometries = np.array(geometries, dtype=object)
+    if include_z is None:
+        include_z = geom_kernel.any_has_z(geometries)
+    coords, index = shapely.get_coordinates(geometries, include_z=include_z, return_index=True)
+
+    # The same rounding rule as the kernel; values it cannot change stay as they are
+    rounded = geom_kernel.round_decimals(coords, precision)
+
+    changed = ((rounded != coords) & ~np.isnan(coords)).any(axis=1)
+    needs_round = np.bincount(index, weights=changed, minlength=len(geometries)) > 0
+    # shapely.transform would be get_coordinates + set_coordinates over every
+    # geometry; calling set_coordinates directly limits it to the changed ones
+    if needs_round.any():
+        idxs = np.flatnonzero(needs_round)
+        geometries[idxs] = shapely.set_coordinates(geometries[idxs], rounded[needs_round[index]])
+    return geometries
+
+
+def _signed_ring_areas(coords, starts, counts):
+    """Shoelace signed area of each ring (positive = counterclockwise)."""
+    areas = np.zeros(len(starts))
+    if len(coords) == 0:
+        return areas
+
+    # Work relative to the first vertex of each ring: the raw products at
+    # projected magnitudes would cancel most of the digits of small rings
+    first = np.repeat(starts, counts)
+    x = coords[:, 0] - coords[first, 0]
+    y = coords[:, 1] - coords[first, 1]
+    # Build the cross products in a single preallocated buffer
+    cross = np.empty(len(coords))
+    np.multiply(x[:-1], y[1:], out=cross[:-1])
+    cross[:-1] -= x[1:] * y[:-1]
+    cross[-1] = 0.0
+    # Discard the segments joining the end of one ring to the start of the next
+    cross[starts - 1] = 0.0
+
+    filled = counts > 0
+    areas[filled] = 0.5 * np.add.reduceat(cross, starts[filled])
+    return areas
+
+
+def _orient_ccw_numpy(geometries, include_z=None):
+    """Fallback for orient_ccw that reverses offending rings in the coordinate buffer."""
+    geometries = np.array(geometries, dtype=object)
+    if include_z is None:
+        include_z = geom_kernel.any_has_z(geometries)
+    coords = shapely.get_coordinates(geometries, include_z=include_z)
+    ring_offsets, ring_signs, ring_geometry, _ = geom_kernel.ring_layout(geometries)
+    starts, counts = ring_offsets[:-1], np.diff(ring_offsets)
+    reverse = _signed_ring_areas(coords, starts, counts) * ring_signs < 0
+    if not reverse.any():
+        return geometries
+
+    ring_index = np.repeat(np.arange(len(counts)), counts)
+    positions = np.arange(len(coords))
+    mirrored = 2 * starts[ring_index] + counts[ring_index] - 1 - positions
+    coords = coords[np.where(reverse[ring_index], mirrored, positions)]
+
+    # Only rebuild the geometries that have at least one reversed ring
+    needs_orient = np.bincount(ring_geometry, weights=reverse, minlength=len(geometries)) > 0
+    idxs = np.flatnonzero(needs_orient)
+    geometries[idxs] = shapely.set_coordinates(
+        geometries[idxs], coords[needs_orient[ring_geometry][ring_index]]
+    )
+    return geometries
+
+
+def orient_ccw(geometries, include_z=None):
+    """Orient polygon exteriors counterclockwise and interiors clockwise."""
+    try:
+        return shapely.orient_polygons(geometries)
+    except AttributeError:
+        # shapely.orient_polygons is only available from Shapely 2.1
+        return _orient_ccw_numpy(geometries, include_z)
+
+
+GEOMETRY_TYPE_NAMES = [
+    'Point', 'LineString', 'LinearRing', 'Polygon',
+    'MultiPoint', 'MultiLineString', 'MultiPolygon', 'GeometryCollection',
+]
+
+
+def geometry_type_counts(geometries, type_ids=None):
+    """Count the geometries per type, most common first (missing ones are skipped)."""
+    if type_ids is None:
+        type_ids = shapely.get_type_id(geometries)
+    counts = np.bincount(type_ids[type_ids >= 0], minlength=len(GEOMETRY_TYPE_NAMES))
+    geom_types = pd.Series(counts, index=GEOMETRY_TYPE_NAMES, name='count')
+    return geom_types[geom_types > 0].sort_values(ascending=False, kind='stable')
+
+
+def check_coordinate_precision(geometries, max_decimals=6, include_z=None):
+    """Count the geometries having coordinates with more than max_decimals decimal places."""
+    if include_z is None:
+        include_z = geom_kernel.any_has_z(geometries)
+    coords, index = shapely.get_coordinates(geometries, include_z=include_z, return_index=True)
+
+    # A coordinate fits the precision iff rounding it to max_decimals leaves it
+    # unchanged; this is exact where an absolute epsilon on the scaled value is not.
+    # NaN (missing Z) is returned as is by round_decimals but compares unequal
+    extra = geom_kernel.round_decimals(coords, max_decimals) != coords
+    extra &= ~np.isnan(coords)
+
+    extra_rows = extra.any(axis=1)
+    if not extra_rows.any():
+        return 0
+    return int(np.unique(index[extra_rows]).size)
+
+
+def check_orientation_stats(gdf):
+    """Check and report orientation statistics."""
+    geometries = np.asarray(gdf.geometry.values)
+    polygonal = np.isin(shapely.get_type_id(geometries), (3, 6))
+    polygonal_count = int(np.count_nonzero(polygonal))
+
+    # MultiPolygons are judged by their largest part
+    parts, part_index = shapely.get_parts(geometries[polygonal], return_index=True)
+    order = np.lexsort((-shapely.area(parts), part_index))
+    sorted_index = part_index[order]
+    first_of_feature = np.ones(len(order), dtype=bool)
+    first_of_feature[1:] = sorted_index[1:] != sorted_index[:-1]
+
+    exteriors = shapely.get_exterior_ring(parts[order[first_of_feature]])
+    ccw_count = int(np.count_nonzero(shapely.is_ccw(exteriors)))
+
+    return {
+        "ccw": ccw_count,
+        "cw": polygonal_count - ccw_count,
+        "other": len(geometries) - polygonal_count,
+    }
+
+
+def _arrow_csv_options(separator, encoding):
+    """Reader options matching pd.read_csv(sep=separator, encoding=encoding)."""
+    return {
+        "read_options": pacsv.ReadOptions(encoding=encoding),
+        "parse_options": pacsv.ParseOptions(delimiter=separator),
+        # pandas reads empty fields as missing values
+        "convert_options": pacsv.ConvertOptions(strings_can_be_null=True),
+    }
+
+
+def read_csv_columns(uploaded_file, separator=',', encoding='utf-8'):
+    """Read the column names of an uploaded CSV without parsing the whole file."""
+    if pacsv is None:
+        preview_df = pd.read_csv(uploaded_file, sep=separator, encoding=encoding, nrows=5)
+        uploaded_file.seek(0)  # Reset file pointer
+        return preview_df.columns.tolist()
+
+    reader = pacsv.open_csv(
+        io.BytesIO(uploaded_file.getvalue()), **_arrow_csv_options(separator, encoding)
+    )
+    return reader.schema.names
+
+
+def read_csv(uploaded_file, separator=',', encoding='utf-8'):
+    """Read an uploaded CSV into a DataFrame."""
+    if pacsv is None:
+        return pd.read_csv(uploaded_file, sep=separator, encoding=encoding)
+
+    table = pacsv.read_csv(
+        io.BytesIO(uploaded_file.getvalue()), **_arrow_csv_options(separator, encoding)
+    )
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
@@ -1,16 +1,33 @@
 import streamlit as st
 import geopandas as gpd
 import pandas as pd
-import re
-from shapely.geometry import Polygon, MultiPolygon
-from shapely.ops import transform
-from shapely.geometry.polygon import orient
-from shapely import is_ccw
-from shapely import wkt
+import numpy as np
+import shapely
 import io
 import tempfile
 import os
 
+import geom_kernel
+from helpers import (
+    check_coordinate_precision,
+    check_orientation_stats,
+    geometry_type_counts,
+    orient_ccw,
+    read_csv,
+    read_csv_columns,
+    round_coordinates,
+)
+
+# Prefer pyogrio with Arrow transfer for reading; fall back to the default engine
+try:
+    import pyogrio  # noqa: F401
+    import pyarrow  # noqa: F401
+
+    gpd.options.io_engine = "pyogrio"
+    READ_OPTIONS = {"engine": "pyogrio", "use_arrow": True}
+except ImportError:
+    READ_OPTIONS = {}
+
 # Set page config
 st.set_page_config(
     page_title="GeoJSON Precision Fixer",
@@ -19,99 +36,29 @@ st.set_page_config(
 )
 
 # Helper Functions
-def round_coordinates(geom, precision=6):
-    if geom is None:
-        return None
-
-    def round_coords(x, y, z=None):
-        # Round and format to exact precision (no more, no less)
-        x_rounded = float(f"{x:.{precision}f}")
-        y_rounded = float(f"{y:.{precision}f}")
-        
-        if z is not None:
-            z_rounded = float(f"{z:.{precision}f}")
-            return (x_rounded, y_rounded, z_rounded)
-        return (x_rounded, y_rounded)
-
-    return transform(round_coords, geom)
-
-
-def fix_cw_to_ccw(geom):
-    """Fix counterclockwise orientation for polygons and multipolygons."""
-    try:
-        if geom is None or geom.is_empty:
-            return geom
-            
-        if isinstance(geom, Polygon):
-            return orient(geom, sign=1.0)
-        elif isinstance(geom, MultiPolygon):
-            fixed_polygons = [orient(poly, sign=1.0) for poly in geom.geoms]
-            return MultiPolygon(fixed_polygons)
-        else:
-            return geom
-    except Exception as e:
-        st.error(f"Error fixing counterclockwise orientation: {e}")
-        return geom
-
-
-def check_coordinate_precision(geometry, max_decimals=6):
-    if geometry is None:
-        return False
-    
-    wkt_string = str(geometry)
-    coords = re.findall(r"(-?\d+\.\d+)", wkt_string)
-    return any(len(coord.split(".")[1]) > max_decimals for coord in coords)
-
-
-def check_orientation_stats(gdf):
-    """Check and report orientation statistics."""
-    cw_count = 0
-    ccw_count = 0
-    other_count = 0
-    
-    for geom in gdf["geometry"]:
-        if isinstance(geom, Polygon):
-            if is_ccw(geom.exterior):
-                ccw_count += 1
-            else:
-                cw_count += 1
-        elif isinstance(geom, MultiPolygon):
-            largest_poly = max(geom.geoms, key=lambda p: p.area)
-            if is_ccw(largest_poly.exterior):
-                ccw_count += 1
-            else:
-                cw_count += 1
-        else:
-            other_count += 1
-    
-    return {"ccw": ccw_count, "cw": cw_count, "other": other_count}
-
-
 def load_file(uploaded_file, file_type, **kwargs):
     """Load file based on type with appropriate parameters."""
     try:
         if file_type == "GeoJSON":
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.geojson') as tmp:
-                tmp.write(uploaded_file.getvalue())
-                tmp_path = tmp.name
-            gdf = gpd.read_file(tmp_path)
-            os.unlink(tmp_path)
-            return gdf
+            return gpd.read_file(io.BytesIO(uploaded_file.getvalue()), **READ_OPTIONS)
             
         elif file_type == "CSV":
             # Read CSV with specified options
-            df = pd.read_csv(
+            df = read_csv(
                 uploaded_file,
-                sep=kwargs.get('separator', ','),
+                separator=kwargs.get('separator', ','),
                 encoding=kwargs.get('encoding', 'utf-8')
             )
             
             # Convert geometry column from WKT to geometry objects
             geom_column = kwargs.get('geometry_column')
             if geom_column and geom_column in df.columns:
-                df['geometry'] = df[geom_column].apply(
-                    lambda x: wkt.loads(x) if pd.notna(x) else None
+                mask = df[geom_column].notna().to_numpy()
+                geoms = np.full(len(df), None, dtype=object)
+                geoms[mask] = shapely.from_wkt(
+                    df.loc[mask, geom_column].to_numpy(dtype=object)
                 )
+                df['geometry'] = geoms
                 gdf = gpd.GeoDataFrame(df, geometry='geometry')
                 
                 # Set CRS if provided
@@ -124,18 +71,108 @@ def load_file(uploaded_file, file_type, **kwargs):
                 return None
                 
         elif file_type == "Shapefile":
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp:
-                tmp.write(uploaded_file.getvalue())
-                tmp_path = tmp.name
-            gdf = gpd.read_file(f"zip://{tmp_path}")
-            os.unlink(tmp_path)
-            return gdf
+            # The zipped Shapefile is read straight from memory (GDAL /vsimem/)
+            return gpd.read_file(io.BytesIO(uploaded_file.getvalue()), **READ_OPTIONS)
             
     except Exception as e:
         st.error(f"Error loading file: {e}")
         return None
 
 
+@st.cache_resource(show_spinner=False, max_entries=4)
+def load_geometries(file_bytes, file_type, csv_options):
+    """Load an uploaded file and extract its coordinate buffers once per upload.
+
+    Shared between reruns (e.g. trying several precisions on the same file), so
+    the result must not be modified.
+    """
+    gdf = load_file(io.BytesIO(file_bytes), file_type, **csv_options)
+    if gdf is None:
+        return None
+
+    # Most data is 2D: detect it once so every pass skips the Z column
+    include_z = geom_kernel.any_has_z(gdf.geometry.values)
+    buffers = None
+    if geom_kernel.NUMBA_AVAILABLE:
+        buffers = geom_kernel.extract_buffers(gdf.geometry.values, include_z)
+    return gdf, include_z, buffers
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def process_file(
+    file_bytes, file_type, precision, fix_orientation, csv_options, _scratch=None
+):
+    """Load, analyse and fix an uploaded file.
+
+    Cached on the upload's bytes and the processing options, so reruns that do
+    not change them (e.g. picking another output format) skip the geometry work.
+    _scratch is an optional buffer to round the coordinates into; being only
+    working memory, it is left out of the cache key.
+    """
+    loaded = load_geometries(file_bytes, file_type, csv_options)
+    if loaded is None:
+        return None
+    gdf, include_z, buffers = loaded
+    gdf = gdf.copy()
+
+    type_ids = buffers['type_ids'] if buffers is not None else None
+    stats = {'geom_types': geometry_type_counts(gdf.geometry.values, type_ids)}
+
+    if geom_kernel.NUMBA_AVAILABLE:
+        # Check, round, orient and re-check in one pass of the compiled kernel
+        gdf['geometry'], kernel_stats = geom_kernel.process_geometries(
+            gdf.geometry.values, precision, fix_orientation, include_z, buffers, _scratch
+        )
+        stats.update(kernel_stats)
+        return gdf, stats
+
+    stats['high_precision_before'] = check_coordinate_precision(
+        gdf.geometry.values, precision, include_z
+    )
+    if fix_orientation:
+        stats['orientation_before'] = check_orientation_stats(gdf)
+
+    gdf['geometry'] = round_coordinates(gdf.geometry.values, precision, include_z)
+    if fix_orientation:
+        gdf['geometry'] = orient_ccw(gdf.geometry.values, include_z)
+
+    stats['high_precision_after'] = check_coordinate_precision(
+        gdf.geometry.values, precision, include_z
+    )
+    if fix_orientation:
+        stats['orientation_after'] = check_orientation_stats(gdf)
+
+    return gdf, stats
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def export_file(file_bytes, file_type, precision, fix_orientation, csv_options, output_format):
+    """Serialize a processed file; returns its bytes, MIME type and file extension."""
+    gdf, _ = process_file(file_bytes, file_type, precision, fix_orientation, csv_options)
+    output_buffer = io.BytesIO()
+
+    if output_format == "GeoJSON":
+        gdf.to_file(output_buffer, driver="GeoJSON")
+        mime_type = "application/json"
+        file_extension = "geojson"
+    elif output_format == "Shapefile":
+        # GDAL cannot write Shapefiles to a file-like object, but given a
+        # .shp.zip path it streams the deflated archive itself
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_path = os.path.join(tmpdir, "output.shp.zip")
+            gdf.to_file(output_path, driver="ESRI Shapefile")
+            with open(output_path, 'rb') as f:
+                output_buffer = io.BytesIO(f.read())
+        mime_type = "application/zip"
+        file_extension = "zip"
+    else:  # GeoPackage
+        gdf.to_file(output_buffer, driver="GPKG")
+        mime_type = "application/geopackage+sqlite3"
+        file_extension = "gpkg"
+
+    return output_buffer.getvalue(), mime_type, file_extension
+
+
 # Streamlit App
 st.title("🗺️ Geospatial Coordinate Precision Fixer")
 st.markdown("Fix coordinate precision and polygon orientation in your geospatial data")
@@ -190,12 +227,11 @@ if uploaded_file:
         
         # Preview CSV to select geometry column
         try:
-            preview_df = pd.read_csv(uploaded_file, sep=separator, encoding=encoding, nrows=5)
-            uploaded_file.seek(0)  # Reset file pointer
+            csv_columns = read_csv_columns(uploaded_file, separator, encoding)
             
             geometry_column = st.sidebar.selectbox(
                 "Geometry Column",
-                options=preview_df.columns.tolist(),
+                options=csv_columns,
                 help="Select the column containing WKT geometry"
             )
             csv_options['geometry_column'] = geometry_column
@@ -237,12 +273,36 @@ if uploaded_file:
         index=0
     )
     
-    # Process button
+    # Process button: remember what was processed, as settings can change afterwards
+    params = (uploaded_file.file_id, precision, fix_orientation, dict(csv_options))
     if st.sidebar.button("🚀 Process File", type="primary"):
-        with st.spinner("Loading file..."):
-            gdf = load_file(uploaded_file, file_type, **csv_options)
+        st.session_state['processed_params'] = params
+    
+    # Keep showing the results on later reruns (e.g. when the output format
+    # changes), but only for the settings they were processed with
+    processed_params = st.session_state.get('processed_params')
+    same_file = processed_params and processed_params[0] == uploaded_file.file_id
+    if same_file and processed_params != params:
+        st.info("Settings changed. Click **Process File** to apply them.")
+    if processed_params == params:
+        file_bytes = uploaded_file.getvalue()
+        with st.spinner("Processing file..."):
+            # Round into a per-session scratch buffer reused across precisions
+            scratch = None
+            loaded = load_geometries(file_bytes, file_type, csv_options)
+            if loaded is not None and loaded[2] is not None:
+                coords = loaded[2]['coords']
+                scratch = st.session_state.get('coord_scratch')
+                if scratch is None or scratch.shape != coords.shape:
+                    scratch = st.session_state['coord_scratch'] = np.empty_like(coords)
+
+            processed = process_file(
+                file_bytes, file_type, precision, fix_orientation, csv_options, scratch
+            )
         
-        if gdf is not None:
+        if processed is not None:
+            gdf, stats = processed
+            
             # Display original data info
             col1, col2, col3 = st.columns(3)
             
@@ -250,7 +310,7 @@ if uploaded_file:
                 st.metric("Total Features", len(gdf))
             
             with col2:
-                geom_types = gdf.geometry.geom_type.value_counts()
+                geom_types = stats['geom_types']
                 st.metric("Geometry Types", len(geom_types))
             
             with col3:
@@ -270,15 +330,13 @@ if uploaded_file:
             # Check original precision
             st.subheader("🔍 Original Data Analysis")
             
-            high_precision_count = gdf['geometry'].apply(
-                lambda g: check_coordinate_precision(g, precision)
-            ).sum()
+            high_precision_count = stats['high_precision_before']
             
             st.info(f"**Features with >{precision} decimal places:** {high_precision_count}")
             
             # Check orientation
             if fix_orientation:
-                orig_orientation = check_orientation_stats(gdf)
+                orig_orientation = stats['orientation_before']
                 col1, col2, col3 = st.columns(3)
                 with col1:
                     st.metric("Counterclockwise", orig_orientation['ccw'])
@@ -287,31 +345,13 @@ if uploaded_file:
                 with col3:
                     st.metric("Other Types", orig_orientation['other'])
             
-            # Process the data
-            st.subheader("⚙️ Processing...")
-            progress_bar = st.progress(0)
-            
-            # Round coordinates
-            progress_bar.progress(33)
-            gdf['geometry'] = gdf['geometry'].apply(
-                lambda geom: round_coordinates(geom, precision)
-            )
-            
-            # Fix orientation
-            if fix_orientation:
-                progress_bar.progress(66)
-                gdf['geometry'] = gdf['geometry'].apply(fix_cw_to_ccw)
-            
-            progress_bar.progress(100)
             st.success("✅ Processing complete!")
             
             # Show results
             st.subheader("📈 Results")
             
             # Verify precision
-            new_high_precision = gdf['geometry'].apply(
-                lambda g: check_coordinate_precision(g, precision)
-            ).sum()
+            new_high_precision = stats['high_precision_after']
             
             col1, col2 = st.columns(2)
             with col1:
@@ -330,7 +370,7 @@ if uploaded_file:
             
             # Show orientation after
             if fix_orientation:
-                new_orientation = check_orientation_stats(gdf)
+                new_orientation = stats['orientation_after']
                 st.write("**Orientation After Processing:**")
                 col1, col2, col3 = st.columns(3)
                 with col1:
@@ -358,34 +398,9 @@ if uploaded_file:
             st.subheader("💾 Download Processed File")
             
             # Create output file
-            output_buffer = io.BytesIO()
-            
-            if output_format == "GeoJSON":
-                gdf.to_file(output_buffer, driver="GeoJSON")
-                mime_type = "application/json"
-                file_extension = "geojson"
-            elif output_format == "Shapefile":
-                with tempfile.TemporaryDirectory() as tmpdir:
-                    output_path = os.path.join(tmpdir, "output.shp")
-                    gdf.to_file(output_path)
-                    
-                    # Create zip file
-                    import zipfile
-                    zip_buffer = io.BytesIO()
-                    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                        for ext in ['.shp', '.shx', '.dbf', '.prj', '.cpg']:
-                            file_path = output_path.replace('.shp', ext)
-                            if os.path.exists(file_path):
-                                zipf.write(file_path, os.path.basename(file_path))
-                    output_buffer = zip_buffer
-                mime_type = "application/zip"
-                file_extension = "zip"
-            else:  # GeoPackage
-                gdf.to_file(output_buffer, driver="GPKG")
-                mime_type = "application/geopackage+sqlite3"
-                file_extension = "gpkg"
-            
-            output_buffer.seek(0)
+            output_data, mime_type, file_extension = export_file(
+                file_bytes, file_type, precision, fix_orientation, csv_options, output_format
+            )
             
             # Generate output filename
             original_name = uploaded_file.name.rsplit('.', 1)[0]
@@ -396,7 +411,7 @@ if uploaded_file:
             
             st.download_button(
                 label=f"📥 Download {output_format}",
-                data=output_buffer,
+                data=output_data,
                 file_name=output_filename,
                 mime=mime_type,
                 type="primary"
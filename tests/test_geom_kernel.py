@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+
+import geom_kernel
+import helpers
+
+pytest.importorskip("numba")
+
+
+def _random_polygons(rng, n, origin=(0.0, 0.0), size=1.0):
+    """Small random rings, including self-intersecting and degenerate ones."""
+    polygons = []
+    for _ in range(n):
+        coords = origin + rng.random((rng.integers(3, 7), 2)) * size
+        if rng.random() < 0.2:
+            coords = np.round(coords, 1)
+        polygon = shapely.polygons(np.vstack([coords, coords[:1]]))
+        if rng.random() < 0.3:
+            hole = origin + np.array([[0.4, 0.4], [0.6, 0.4], [0.5, 0.6], [0.4, 0.4]]) * size
+            polygon = shapely.Polygon(polygon.exterior, [hole])
+        polygons.append(polygon)
+    return polygons
+
+
+def _geometries(origin, size):
+    rng = np.random.default_rng(0)
+    polygons = _random_polygons(rng, 600, origin, size)
+    return np.array(
+        polygons[:300]
+        + [shapely.MultiPolygon(polygons[i:i + 3]) for i in range(300, 450, 3)]
+        + [shapely.GeometryCollection([p, shapely.Point(origin)]) for p in polygons[450:550]]
+        + [
+            shapely.GeometryCollection(
+                [shapely.MultiPolygon(polygons[i:i + 2]), shapely.Point(origin)]
+            )
+            for i in range(550, 600, 2)
+        ]
+        + [None, shapely.Point(origin)],
+        dtype=object,
+    )
+
+
+def _orientation_stats(geometries):
+    return helpers.check_orientation_stats(pd.DataFrame({"geometry": geometries}))
+
+
+@pytest.mark.parametrize(
+    "origin, size",
+    [((0.0, 0.0), 1.0), ((500000.0, 4000000.0), 1.0), ((500000.0, 9999999.0), 0.001)],
+)
+@pytest.mark.parametrize("do_ccw", [True, False])
+def test_process_geometries_matches_orient_polygons(origin, size, do_ccw):
+    geometries = _geometries(origin, size)
+    result, stats = geom_kernel.process_geometries(geometries, 6, do_ccw)
+
+    expected = helpers.round_coordinates(geometries, 6)
+    if do_ccw:
+        expected = shapely.orient_polygons(expected)
+
+    assert (shapely.to_wkt(result) == shapely.to_wkt(expected)).all()
+    assert stats["high_precision_before"] == helpers.check_coordinate_precision(geometries, 6)
+    assert stats["high_precision_after"] == helpers.check_coordinate_precision(expected, 6)
+    assert stats["orientation_before"] == _orientation_stats(geometries)
+    assert stats["orientation_after"] == _orientation_stats(expected)
+
+
+def test_ring_is_ccw_matches_shapely():
+    rng = np.random.default_rng(1)
+    rings = []
+    for i in range(2000):
+        coords = rng.integers(0, 4, (rng.integers(3, 8), 2)).astype(float)
+        if i % 2:
+            coords += (500000.0, 4000000.0)
+        rings.append(np.vstack([coords, coords[:1]]))
+    offsets = np.cumsum([0] + [len(r) for r in rings])
+    coords = np.vstack(rings)
+
+    ccw = np.array([
+        geom_kernel._ring_is_ccw(coords, offsets[r], offsets[r + 1]) for r in range(len(rings))
+    ])
+    indices = np.repeat(np.arange(len(rings)), np.diff(offsets))
+    expected = shapely.is_ccw(shapely.linearrings(coords, indices=indices))
+    decided = ccw != -1
+    assert (ccw[decided] == expected[decided]).all()
+
+
+@pytest.mark.parametrize("precision", range(1, 16))
+def test_round_decimals_matches_string_formatting(precision):
+    rng = np.random.default_rng(precision)
+    values = np.concatenate([
+        rng.uniform(-180, 180, 20000),
+        rng.uniform(-1e7, 1e7, 5000),
+        np.arange(-400, 400) / 8,
+        [57.301398633326755, 106.81234567890122, 1e20, np.nan],
+    ])
+    expected = np.array([float(f"{v:.{precision}f}") for v in values])
+    np.testing.assert_array_equal(geom_kernel.round_decimals(values, precision), expected)
+
+
+@pytest.mark.parametrize("precision", [6, 14, 15])
+def test_process_geometries_rounds_like_string_formatting(precision):
+    rng = np.random.default_rng(2)
+    coords = np.c_[rng.uniform(-180, 180, 5000), rng.uniform(-90, 90, 5000)]
+    coords[0] = (10, 57.301398633326755)
+    geometries = shapely.points(coords)
+    result, stats = geom_kernel.process_geometries(geometries, precision, True)
+
+    expected = np.array([[float(f"{v:.{precision}f}") for v in row] for row in coords])
+    np.testing.assert_array_equal(shapely.get_coordinates(result), expected)
+    assert stats["high_precision_before"] == np.count_nonzero((expected != coords).any(axis=1))
+    assert stats["high_precision_after"] == 0
@@ -0,0 +1,191 @@
+import io
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+from shapely.geometry import MultiPolygon, Polygon
+from shapely.geometry.polygon import orient
+from shapely.ops import transform
+
+import helpers
+
+
+# Per-feature implementations from before the vectorized rewrite, kept as oracles
+
+
+def baseline_round_coordinates(geom, precision=6):
+    if geom is None:
+        return None
+
+    def round_coords(x, y, z=None):
+        x_rounded = float(f"{x:.{precision}f}")
+        y_rounded = float(f"{y:.{precision}f}")
+        if z is not None:
+            return (x_rounded, y_rounded, float(f"{z:.{precision}f}"))
+        return (x_rounded, y_rounded)
+
+    return transform(round_coords, geom)
+
+
+def baseline_check_coordinate_precision(geometry, max_decimals=6):
+    if geometry is None:
+        return False
+    coords = re.findall(r"(-?\d+\.\d+)", str(geometry))
+    return any(len(coord.split(".")[1]) > max_decimals for coord in coords)
+
+
+def baseline_check_orientation_stats(geometries):
+    counts = {"ccw": 0, "cw": 0, "other": 0}
+    for geom in geometries:
+        if isinstance(geom, Polygon):
+            counts["ccw" if shapely.is_ccw(geom.exterior) else "cw"] += 1
+        elif isinstance(geom, MultiPolygon):
+            largest_poly = max(geom.geoms, key=lambda p: p.area)
+            counts["ccw" if shapely.is_ccw(largest_poly.exterior) else "cw"] += 1
+        else:
+            counts["other"] += 1
+    return counts
+
+
+def baseline_fix_cw_to_ccw(geom):
+    if geom is None or geom.is_empty:
+        return geom
+    if isinstance(geom, Polygon):
+        return orient(geom, sign=1.0)
+    if isinstance(geom, MultiPolygon):
+        return MultiPolygon([orient(poly, sign=1.0) for poly in geom.geoms])
+    return geom
+
+
+def assert_same_geometries(result, expected):
+    """Same structure and bit-identical coordinates (WKT alone trims digits)."""
+    assert (shapely.to_wkt(result) == shapely.to_wkt(expected)).all()
+    np.testing.assert_array_equal(
+        shapely.get_coordinates(result, include_z=True),
+        shapely.get_coordinates(expected, include_z=True),
+    )
+
+
+def _polygon(rng, origin, size, ccw):
+    angles = np.sort(rng.uniform(0, 2 * np.pi, rng.integers(3, 12)))
+    if not ccw:
+        angles = angles[::-1]
+    radius = size * rng.uniform(0.5, 1.0)
+    ring = np.c_[np.cos(angles), np.sin(angles)]
+    shell = origin + radius * ring
+    if rng.random() < 0.3:
+        return Polygon(shell, [origin + radius / 3 * ring])
+    return Polygon(shell)
+
+
+@pytest.fixture(scope="module")
+def geometries():
+    rng = np.random.default_rng(0)
+    geoms = []
+    for i in range(400):
+        origin = rng.uniform(-180, 180, 2) if i % 2 else rng.uniform(0, 1e6, 2)
+        size = 10 ** rng.uniform(-3, 1)
+        polygons = [
+            _polygon(rng, origin + 3 * size * k, size, rng.random() < 0.5) for k in range(3)
+        ]
+        kind = i % 5
+        if kind == 0:
+            geoms.append(polygons[0])
+        elif kind == 1:
+            geoms.append(MultiPolygon(polygons))
+        elif kind == 2:
+            geoms.append(shapely.Point(origin))
+        elif kind == 3:
+            geoms.append(shapely.LineString(polygons[0].exterior.coords))
+        else:
+            nested = MultiPolygon(polygons[:2])
+            geoms.append(shapely.GeometryCollection([nested, shapely.Point(origin)]))
+    geoms += [
+        None,
+        shapely.from_wkt("POLYGON EMPTY"),
+        shapely.from_wkt("POLYGON Z ((0 0 1.123456789, 1 1 2, 0 1 3, 0 0 1.123456789))"),
+        shapely.Point(10, 57.301398633326755),
+        shapely.Point(106.81234567890122, 1),
+        shapely.Point(1.5, 2.25),
+    ]
+    return np.array(geoms, dtype=object)
+
+
+# The baseline went through the deprecated shapely.ops.transform
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+@pytest.mark.parametrize("precision", [1, 4, 6, 9, 14, 15])
+def test_round_coordinates_matches_baseline(geometries, precision):
+    result = helpers.round_coordinates(geometries, precision)
+    expected = [baseline_round_coordinates(g, precision) for g in geometries]
+    assert_same_geometries(result, expected)
+
+
+def test_round_coordinates_keeps_unchanged_geometries(geometries):
+    result = helpers.round_coordinates(geometries, 15)
+    assert result[-1] is geometries[-1]
+    assert result[-2] is geometries[-2]
+
+
+@pytest.mark.parametrize("precision", [1, 4, 6, 9, 14])
+def test_check_coordinate_precision_matches_baseline(geometries, precision):
+    expected = sum(baseline_check_coordinate_precision(g, precision) for g in geometries)
+    assert helpers.check_coordinate_precision(geometries, precision) == expected
+
+
+def test_check_coordinate_precision_after_rounding(geometries):
+    rounded = helpers.round_coordinates(geometries, 6)
+    assert helpers.check_coordinate_precision(rounded, 6) == 0
+
+
+def test_check_orientation_stats_matches_baseline(geometries):
+    gdf = pd.DataFrame({"geometry": geometries})
+    assert helpers.check_orientation_stats(gdf) == baseline_check_orientation_stats(geometries)
+
+
+def test_orient_ccw_matches_baseline(geometries):
+    result = helpers.orient_ccw(geometries)
+    polygonal = [isinstance(g, (Polygon, MultiPolygon)) for g in geometries]
+    expected = [baseline_fix_cw_to_ccw(g) for g in geometries[polygonal]]
+    assert_same_geometries(result[polygonal], expected)
+
+
+def test_orient_ccw_numpy_matches_orient_polygons(geometries):
+    result = helpers._orient_ccw_numpy(geometries)
+    assert_same_geometries(result, shapely.orient_polygons(geometries))
+
+
+def test_orient_ccw_falls_back_without_orient_polygons(geometries, monkeypatch):
+    expected = shapely.orient_polygons(geometries)
+    monkeypatch.delattr(shapely, "orient_polygons")
+    assert_same_geometries(helpers.orient_ccw(geometries), expected)
+
+
+def test_geometry_type_counts_matches_baseline(geometries):
+    expected = pd.Series(geometries).dropna().map(lambda g: g.geom_type).value_counts()
+    counts = helpers.geometry_type_counts(geometries)
+    assert counts.to_dict() == expected.to_dict()
+    assert counts.is_monotonic_decreasing
+
+
+CSV = "id;name;wkt\n1;a;POINT (1 2)\n2;;\n3;é;POLYGON ((0 0, 1 0, 1 1, 0 0))\n"
+
+
+@pytest.mark.parametrize("arrow", [True, False])
+def test_read_csv_matches_pandas(arrow, monkeypatch):
+    if not arrow:
+        monkeypatch.setattr(helpers, "pacsv", None)
+    elif helpers.pacsv is None:
+        pytest.skip("pyarrow is not installed")
+    # BytesIO has the getvalue/seek interface of Streamlit's UploadedFile
+    upload = io.BytesIO(CSV.encode("latin-1"))
+    expected = pd.read_csv(io.BytesIO(CSV.encode("latin-1")), sep=";", encoding="latin-1")
+
+    assert helpers.read_csv_columns(upload, ";", "latin-1") == expected.columns.tolist()
+    df = helpers.read_csv(upload, ";", "latin-1")
+    assert df.columns.tolist() == expected.columns.tolist()
+    assert df["id"].tolist() == expected["id"].tolist()
+    for column in ("name", "wkt"):
+        assert df[column].isna().tolist() == expected[column].isna().tolist()
+        assert df[column].dropna().tolist() == expected[column].dropna().tolist()